@@ -2,15 +2,20 @@
 from __future__ import annotations
 
 import asyncio
-from typing import Any, Dict, List, Optional
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse, Response
 from pydantic import BaseModel, Field
+from starlette.background import BackgroundTask
 
 from src.config import Settings, get_settings
 from src.rag.pipeline import RAGPipeline
+from src.shared.cache import ResponseCache
 
-app = FastAPI(title="Bedrock RAG Service", version="1.0.0")
+LOGGER = logging.getLogger(__name__)
 
 
 class HistoryTurn(BaseModel):
@@ -42,13 +47,38 @@ class QueryResponse(BaseModel):
 
 pipeline: RAGPipeline | None = None
 settings: Settings | None = None
+response_cache: ResponseCache | None = None
 
 
-@app.on_event("startup")
-async def startup_event() -> None:
-    global pipeline, settings
+def _warm_up(rag_pipeline: RAGPipeline) -> None:
+    """Run the retriever's own search path once before serving traffic.
+
+    This opens a pooled Aurora connection, resolves Bedrock credentials, caches the
+    collection id and exercises the batched search statement used by /query.
+    """
+    try:
+        rag_pipeline.retriever._search_candidates("warmup", [], None)
+    except Exception as exc:  # pragma: no cover - network call
+        LOGGER.warning("Warm-up query failed: %s", exc)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    global pipeline, settings, response_cache
     settings = get_settings()
-    pipeline = RAGPipeline(settings=settings)
+    pipeline = await asyncio.to_thread(RAGPipeline, settings=settings)
+    response_cache = ResponseCache.from_settings(settings)
+    await asyncio.to_thread(_warm_up, pipeline)
+    yield
+    await response_cache.close()
+
+
+app = FastAPI(
+    title="Bedrock RAG Service",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 
 @app.get("/health")
@@ -56,21 +86,32 @@ async def health() -> Dict[str, str]:
     return {"status": "ok"}
 
 
-@app.post("/query", response_model=QueryResponse)
-async def query_rag(request: QueryRequest) -> QueryResponse:
-    if pipeline is None:
+# The pipeline builds the result itself, so it is rendered straight to JSON with
+# orjson instead of going through validation and jsonable_encoder; `responses`
+# keeps QueryResponse in the OpenAPI schema.
+@app.post("/query", response_model=None, responses={200: {"model": QueryResponse}})
+async def query_rag(request: QueryRequest) -> Response:
+    if pipeline is None or settings is None or response_cache is None:
         raise HTTPException(status_code=503, detail="Pipeline not initialised")
     if not request.question.strip():
         raise HTTPException(status_code=400, detail="Question must not be empty")
 
-    history_payload = [turn.dict() for turn in request.history] if request.history else None
-
-    loop = asyncio.get_event_loop()
-    result = await loop.run_in_executor(
-        None,
-        lambda: pipeline.run(request.question, history_payload),
-    )
-    return QueryResponse(**result)
+    if request.history:
+        # Answers to follow-up turns depend on the conversation, so never cache them.
+        history_payload = [turn.dict() for turn in request.history]
+        result = await pipeline.arun(request.question, history_payload)
+        return ORJSONResponse(result)
+
+    cache_key = response_cache.key_for(request.question)
+    cached = await response_cache.get(cache_key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+    result = await pipeline.arun(request.question, None)
+    response = ORJSONResponse(result)
+    # Store the rendered body so a hit serves exactly these bytes without re-encoding;
+    # the write runs after the response is sent so a slow Redis never delays it.
+    response.background = BackgroundTask(response_cache.set, cache_key, response.body)
+    return response
 
 
 __all__ = ["app"]
@@ -3,7 +3,7 @@ from __future__ import annotations
 
 import os
 from functools import lru_cache
-from typing import Optional
+from typing import Any, Dict, Optional
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -43,6 +43,9 @@ class Settings(BaseSettings):
     pg_database: str = Field(validation_alias="PG_DATABASE")
     pg_use_ssl: bool = Field(default=True, validation_alias="PG_USE_SSL")
     pg_require_iam: bool = Field(default=False, validation_alias="PG_REQUIRE_IAM")
+    pg_pool_size: int = Field(default=16, validation_alias="PG_POOL_SIZE")
+    pg_max_overflow: int = Field(default=16, validation_alias="PG_MAX_OVERFLOW")
+    pg_pool_recycle_seconds: int = Field(default=1800, validation_alias="PG_POOL_RECYCLE_SECONDS")
 
     vector_collection: str = Field(default="rag_docs", validation_alias="PG_VECTOR_COLLECTION")
     vector_search_k: int = Field(default=8, validation_alias="VECTOR_SEARCH_K")
@@ -55,6 +58,13 @@ class Settings(BaseSettings):
     fusion_variant_count: int = Field(default=3, validation_alias="FUSION_VARIANT_COUNT")
     enable_hyde: bool = Field(default=False, validation_alias="ENABLE_HYDE")
 
+    llm_cache_size: int = Field(default=2048, validation_alias="LLM_CACHE_SIZE")
+    llm_cache_ttl_seconds: int = Field(default=3600, validation_alias="LLM_CACHE_TTL_SECONDS")
+    embedding_cache_size: int = Field(default=512, validation_alias="EMBEDDING_CACHE_SIZE")
+
+    redis_url: Optional[str] = Field(default=None, validation_alias="REDIS_URL")
+    response_cache_ttl_seconds: int = Field(default=1800, validation_alias="RESPONSE_CACHE_TTL_SECONDS")
+
     answer_language: str = Field(default="vi", validation_alias="ANSWER_LANGUAGE")
 
     @property
@@ -70,6 +80,16 @@ class Settings(BaseSettings):
             f"@{self.pg_host}:{self.pg_port}/{self.pg_database}?sslmode={sslmode}"
         )
 
+    @property
+    def pg_engine_args(self) -> Dict[str, Any]:
+        """SQLAlchemy engine options keeping warm, validated connections to Aurora."""
+        return {
+            "pool_size": self.pg_pool_size,
+            "max_overflow": self.pg_max_overflow,
+            "pool_pre_ping": True,
+            "pool_recycle": self.pg_pool_recycle_seconds,
+        }
+
 
 def _sync_aws_region(settings: Settings) -> None:
     """Ensure boto3 sees the same region as our settings."""
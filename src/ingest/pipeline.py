@@ -2,14 +2,25 @@
 from __future__ import annotations
 
 import argparse
+import itertools
 import logging
-from typing import List, Sequence
+import multiprocessing
+import os
+import tempfile
+import uuid
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Deque, Iterable, Iterator, List, Optional, Sequence
 
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from langchain.schema import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores.pgvector import PGVector
-from langchain_community.document_loaders import S3DirectoryLoader
+from langchain_community.document_loaders import UnstructuredFileLoader
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
 
 from src.config import get_settings
 from src.shared import bedrock
@@ -17,6 +28,9 @@ from src.shared import bedrock
 LOGGER = logging.getLogger(__name__)
 
 SUPPORTED_SUFFIXES = (".txt", ".md", ".pdf", ".html", ".json")
+MB = 1024 * 1024
+# Upper bound on objects downloaded/parsed ahead of the persistence step.
+MAX_PENDING_OBJECTS = 32
 
 
 def _configure_logging(verbose: bool) -> None:
@@ -24,52 +38,154 @@ def _configure_logging(verbose: bool) -> None:
     logging.basicConfig(level=level, format="%(asctime)s %(levelname)s %(name)s %(message)s")
 
 
-def load_documents(bucket: str, prefix: str, allowed_suffixes: Sequence[str]) -> List[Document]:
-    """Load documents from S3 using LangChain's S3DirectoryLoader."""
+def iter_s3_keys(
+    s3_client: Any, bucket: str, prefix: str, allowed_suffixes: Sequence[str]
+) -> Iterator[str]:
+    """Yield object keys under the prefix whose extension is allowed."""
 
-    LOGGER.info("Loading documents from s3://%s/%s", bucket, prefix or "")
-    loader = S3DirectoryLoader(
-        bucket=bucket,
-        prefix=prefix or "",
-    )
-    documents = [
-        doc
-        for doc in loader.load()
-        if doc.metadata.get("source", "").lower().endswith(tuple(allowed_suffixes))
-    ]
-    LOGGER.info("Loaded %d documents", len(documents))
-    return documents
+    suffixes = tuple(suffix.lower() for suffix in allowed_suffixes)
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix or ""):
+        for obj in page.get("Contents", []):
+            key = obj["Key"]
+            if key.endswith("/") or not key.lower().endswith(suffixes):
+                continue
+            yield key
+
+
+def download_s3_object(
+    s3_client: Any, bucket: str, key: str, dest_dir: str, transfer_config: TransferConfig
+) -> str:
+    """Download an object into dest_dir, keeping its extension for the parser."""
 
+    _, suffix = os.path.splitext(key)
+    fd, path = tempfile.mkstemp(dir=dest_dir, suffix=suffix)
+    os.close(fd)
+    s3_client.download_file(bucket, key, path, Config=transfer_config)
+    return path
 
-def chunk_documents(
-    documents: Sequence[Document], chunk_size: int, chunk_overlap: int
-) -> List[Document]:
-    """Split documents preserving S3 provenance metadata."""
 
-    splitter = RecursiveCharacterTextSplitter(
+def _build_splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
         separators=["\n\n", "\n", ". ", " "],
     )
-    chunks = splitter.split_documents(list(documents))
-    LOGGER.info("Split into %d chunks", len(chunks))
 
-    for idx, chunk in enumerate(chunks):
-        metadata = dict(chunk.metadata)
-        metadata.setdefault("chunk_id", idx)
-        metadata.setdefault("source", metadata.get("source"))
-        chunk.metadata = metadata
-    return chunks
 
+def parse_file(path: str, source: str, chunk_size: int, chunk_overlap: int) -> List[Document]:
+    """Parse and split a downloaded file; runs inside a worker process."""
 
-def persist_chunks(
+    documents = UnstructuredFileLoader(path).load()
+    for doc in documents:
+        doc.metadata["source"] = source
+    return _build_splitter(chunk_size, chunk_overlap).split_documents(documents)
+
+
+def stream_chunks(
+    bucket: str,
+    prefix: str,
+    allowed_suffixes: Sequence[str],
+    chunk_size: int,
+    chunk_overlap: int,
+    download_workers: int = 16,
+    parse_workers: Optional[int] = None,
+) -> Iterator[Document]:
+    """Download, parse and split S3 objects concurrently, yielding chunks in key order.
+
+    Downloads run on a thread pool and parsing on a process pool, so network and
+    CPU work overlap. At most MAX_PENDING_OBJECTS objects are in flight, which
+    keeps resident memory bounded regardless of corpus size.
+    """
+
+    LOGGER.info("Streaming documents from s3://%s/%s", bucket, prefix or "")
+    transfer_config = TransferConfig(multipart_threshold=8 * MB, max_concurrency=8)
+    # Every download thread may run max_concurrency ranged GETs; size the pool for all
+    # of them so urllib3 keeps connections alive instead of discarding them.
+    s3_client = boto3.client(
+        "s3",
+        config=Config(max_pool_connections=download_workers * transfer_config.max_concurrency),
+    )
+    file_count = 0
+    chunk_id = 0
+
+    with tempfile.TemporaryDirectory() as tmp_dir, ThreadPoolExecutor(
+        max_workers=download_workers
+    ) as downloads, ProcessPoolExecutor(
+        # Workers start lazily from a download thread; forking while sibling threads
+        # hold boto3/urllib3/logging locks can deadlock the children.
+        max_workers=parse_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as parsers:
+
+        def process(key: str) -> List[Document]:
+            # One bad object must not abort a run that may already have reset the collection.
+            source = f"s3://{bucket}/{key}"
+            path: Optional[str] = None
+            try:
+                path = download_s3_object(s3_client, bucket, key, tmp_dir, transfer_config)
+                return parsers.submit(parse_file, path, source, chunk_size, chunk_overlap).result()
+            except Exception as exc:  # pragma: no cover - network/parser errors
+                LOGGER.warning("Skipping %s: %s", source, exc)
+                return []
+            finally:
+                if path is not None:
+                    os.unlink(path)
+
+        def completed() -> Iterator[List[Document]]:
+            pending: Deque[Future[List[Document]]] = deque()
+            for key in iter_s3_keys(s3_client, bucket, prefix, allowed_suffixes):
+                pending.append(downloads.submit(process, key))
+                if len(pending) >= MAX_PENDING_OBJECTS:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+        for chunks in completed():
+            file_count += 1
+            for chunk in chunks:
+                metadata = dict(chunk.metadata)
+                metadata.setdefault("chunk_id", chunk_id)
+                chunk.metadata = metadata
+                chunk_id += 1
+                yield chunk
+    LOGGER.info("Split %d documents into %d chunks", file_count, chunk_id)
+
+
+def _bulk_insert(
+    vector_store: PGVector,
+    collection_id: uuid.UUID,
     chunks: Sequence[Document],
+    embeddings: Sequence[List[float]],
+) -> None:
+    """Insert a batch of embedded chunks with one multi-row INSERT and commit."""
+
+    rows = [
+        {
+            "collection_id": collection_id,
+            "embedding": embedding,
+            "document": chunk.page_content,
+            "cmetadata": chunk.metadata,
+            "custom_id": str(uuid.uuid4()),
+        }
+        for chunk, embedding in zip(chunks, embeddings)
+    ]
+    with Session(vector_store._bind) as session:
+        session.execute(insert(vector_store.EmbeddingStore), rows)
+        session.commit()
+
+
+def persist_chunks(
+    chunks: Iterable[Document],
     collection_name: str,
     reset_collection: bool,
+    batch_size: int = 500,
 ) -> None:
-    """Persist chunks into Aurora PostgreSQL using pgvector."""
+    """Persist chunks into Aurora PostgreSQL using pgvector, batch by batch."""
 
-    if not chunks:
+    chunk_iter = iter(chunks)
+    first_chunk = next(chunk_iter, None)
+    if first_chunk is None:
         LOGGER.warning("No chunks to persist")
         return
 
@@ -96,8 +212,19 @@ def persist_chunks(
         except Exception as exc:  # pragma: no cover - requires database
             LOGGER.warning("Failed to reset collection %s: %s", collection_name, exc)
 
-    LOGGER.info("Persisting %d chunks into collection '%s'", len(chunks), collection_name)
-    vector_store.add_documents(list(chunks))
+    with Session(vector_store._bind) as session:
+        collection = vector_store.get_collection(session)
+        if collection is None:
+            raise RuntimeError(f"Collection {collection_name} does not exist")
+        collection_id = collection.uuid
+
+    LOGGER.info("Persisting chunks into collection '%s'", collection_name)
+    persisted = 0
+    for batch in bedrock.chunked(itertools.chain([first_chunk], chunk_iter), batch_size):
+        embeddings = bedrock.embed_texts(embedding_model, [chunk.page_content for chunk in batch])
+        _bulk_insert(vector_store, collection_id, batch, embeddings)
+        persisted += len(batch)
+        LOGGER.info("Persisted %d chunks", persisted)
     LOGGER.info("Completed persistence")
 
 
@@ -109,6 +236,9 @@ def main() -> None:
     parser.add_argument("--prefix", default=settings.s3_prefix, help="Optional S3 prefix")
     parser.add_argument("--suffixes", nargs="*", default=SUPPORTED_SUFFIXES, help="Allowed file extensions")
     parser.add_argument("--no-reset", action="store_true", help="Do not drop the existing collection before ingest")
+    parser.add_argument("--download-workers", type=int, default=16, help="Concurrent S3 downloads")
+    parser.add_argument("--parse-workers", type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=500, help="Chunks persisted per database round-trip")
     parser.add_argument("--verbose", action="store_true", help="Enable debug logging")
     args = parser.parse_args()
 
@@ -116,9 +246,21 @@ def main() -> None:
 
     boto3.setup_default_session(region_name=settings.aws_region)
 
-    docs = load_documents(settings.s3_bucket, args.prefix, args.suffixes)
-    chunks = chunk_documents(docs, settings.chunk_size, settings.chunk_overlap)
-    persist_chunks(chunks, args.collection, reset_collection=not args.no_reset)
+    chunks = stream_chunks(
+        settings.s3_bucket,
+        args.prefix,
+        args.suffixes,
+        settings.chunk_size,
+        settings.chunk_overlap,
+        download_workers=args.download_workers,
+        parse_workers=args.parse_workers,
+    )
+    persist_chunks(
+        chunks,
+        args.collection,
+        reset_collection=not args.no_reset,
+        batch_size=args.batch_size,
+    )
 
 
 if __name__ == "__main__":
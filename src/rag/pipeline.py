@@ -1,6 +1,10 @@
 """High level LangChain pipeline orchestrating the RAG flow."""
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import io
+import json
 import logging
 import re
 from typing import Dict, List, Optional
@@ -9,15 +13,25 @@ from langchain.schema import Document
 from langchain_core.prompts import ChatPromptTemplate
 
 from src.config import Settings, get_settings
-from src.rag.retriever import AuroraPGVectorRetriever, build_retriever
+from src.rag.retriever import AuroraPGVectorRetriever, RetrievalResult, build_retriever
 from src.shared import bedrock
+from src.shared.cache import TTLCache
 from src.shared.prompts import PromptRepo
 
 LOGGER = logging.getLogger(__name__)
 
+_RESULT_RE = re.compile(r"<result>(.*?)</result>", re.DOTALL)
+
+_ANSWER_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        ("system", PromptRepo.get_system_prompt()),
+        ("human", PromptRepo.get_human_prompt()),
+    ]
+)
+
 
 def _cleanup_result_tag(text: str) -> str:
-    match = re.search(r"<result>(.*?)</result>", text, flags=re.DOTALL)
+    match = _RESULT_RE.search(text)
     return match.group(1).strip() if match else text.strip()
 
 
@@ -32,16 +46,23 @@ def _format_history(history: Optional[List[Dict[str, str]]]) -> str:
     return "\n".join(lines)
 
 
+def _history_key(history: List[Dict[str, str]]) -> str:
+    serialised = json.dumps(history, ensure_ascii=False, sort_keys=True)
+    return hashlib.blake2b(serialised.encode("utf-8"), digest_size=16).hexdigest()
+
+
 def _format_contexts(docs: List[Document]) -> str:
-    blocks: List[str] = []
+    buffer = io.StringIO()
     for idx, doc in enumerate(docs, start=1):
-        source = doc.metadata.get("source", "unknown")
+        if idx > 1:
+            buffer.write("\n\n")
+        buffer.write(f"[{idx}] {doc.metadata.get('source', 'unknown')}")
         score = doc.metadata.get("rerank_score")
-        prefix = f"[{idx}] {source}"
         if score is not None:
-            prefix += f" (score={score:.3f})"
-        blocks.append(f"{prefix}\n{doc.page_content.strip()}")
-    return "\n\n".join(blocks)
+            buffer.write(f" (score={score:.3f})")
+        buffer.write("\n")
+        buffer.write(doc.page_content.strip())
+    return buffer.getvalue()
 
 
 class RAGPipeline:
@@ -54,13 +75,11 @@ class RAGPipeline:
     ) -> None:
         self.settings = settings or get_settings()
         self.retriever = retriever or build_retriever(self.settings)
-        self.answer_llm = bedrock.get_chat_model(self.settings.bedrock_chat_model_id)
-        self.answer_prompt = ChatPromptTemplate.from_messages(
-            [
-                ("system", PromptRepo.get_system_prompt()),
-                ("human", PromptRepo.get_human_prompt()),
-            ]
+        self._rewrite_cache: TTLCache[str] = TTLCache(
+            self.settings.llm_cache_size, self.settings.llm_cache_ttl_seconds
         )
+        self.answer_llm = bedrock.get_chat_model(self.settings.bedrock_chat_model_id)
+        self.answer_prompt = _ANSWER_PROMPT
 
     def _rewrite_question(
         self, question: str, history: Optional[List[Dict[str, str]]]
@@ -70,6 +89,11 @@ class RAGPipeline:
         history_text = _format_history(history)
         if not history_text:
             return question
+        cache_key = (question, _history_key(history))
+        cached = self._rewrite_cache.get(cache_key)
+        if cached is not None:
+            LOGGER.debug("Rewritten question cache hit")
+            return cached
         system_prompt = PromptRepo.get_contextualize_system_prompt()
         user_prompt = (
             f"Conversation so far:\n{history_text}\n\n"
@@ -86,27 +110,29 @@ class RAGPipeline:
             return question
         rewritten = _cleanup_result_tag(response)
         LOGGER.debug("Rewritten question: %s", rewritten)
-        return rewritten or question
+        rewritten = rewritten or question
+        self._rewrite_cache.set(cache_key, rewritten)
+        return rewritten
 
     def _build_context(self, docs: List[Document]) -> str:
         if not docs:
             return ""
         return _format_contexts(docs)
 
-    def run(
+    def _answer_messages(self, question: str, docs: List[Document]) -> List[object]:
+        context_text = self._build_context(docs)
+        return self.answer_prompt.format_messages(
+            contexts=context_text,
+            question=question,
+        )
+
+    def _build_result(
         self,
         question: str,
-        history: Optional[List[Dict[str, str]]] = None,
+        rewritten_question: str,
+        response: object,
+        retrieval: RetrievalResult,
     ) -> Dict[str, object]:
-        LOGGER.info("Running RAG pipeline")
-        rewritten_question = self._rewrite_question(question, history)
-        retrieved_docs = self.retriever.get_relevant_documents(rewritten_question)
-        context_text = self._build_context(retrieved_docs)
-        messages = self.answer_prompt.format_messages(
-            contexts=context_text,
-            question=rewritten_question,
-        )
-        response = self.answer_llm.invoke(messages)
         answer_text = getattr(response, "content", "")
         if isinstance(answer_text, list):
             answer_text = "".join(
@@ -119,18 +145,43 @@ class RAGPipeline:
                 "content": doc.page_content,
                 "metadata": doc.metadata,
             }
-            for doc in retrieved_docs
+            for doc in retrieval.documents
         ]
         result = {
             "question": question,
             "rewritten_question": rewritten_question,
             "answer": answer_text.strip(),
             "contexts": context_payload,
-            "query_variants": self.retriever.last_query_variants,
-            "hyde_document": self.retriever.last_hypothetical_document,
+            "query_variants": retrieval.query_variants,
+            "hyde_document": retrieval.hypothetical_document,
         }
         return result
 
+    def run(
+        self,
+        question: str,
+        history: Optional[List[Dict[str, str]]] = None,
+    ) -> Dict[str, object]:
+        LOGGER.info("Running RAG pipeline")
+        rewritten_question = self._rewrite_question(question, history)
+        retrieval = self.retriever.retrieve(rewritten_question)
+        messages = self._answer_messages(rewritten_question, retrieval.documents)
+        response = self.answer_llm.invoke(messages)
+        return self._build_result(question, rewritten_question, response, retrieval)
+
+    async def arun(
+        self,
+        question: str,
+        history: Optional[List[Dict[str, str]]] = None,
+    ) -> Dict[str, object]:
+        """Async variant of :meth:`run` that never blocks the event loop."""
+        LOGGER.info("Running RAG pipeline")
+        rewritten_question = await asyncio.to_thread(self._rewrite_question, question, history)
+        retrieval = await self.retriever.aretrieve(rewritten_question)
+        messages = self._answer_messages(rewritten_question, retrieval.documents)
+        response = await self.answer_llm.ainvoke(messages)
+        return self._build_result(question, rewritten_question, response, retrieval)
+
 
 __all__ = ["RAGPipeline"]
 
@@ -1,21 +1,69 @@
 """Custom retriever that mirrors rag.py behaviour using Aurora PGVector."""
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import Dict, List, Optional, Sequence
+from array import array
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Hashable, List, Optional, Sequence
 
 from langchain.schema import BaseRetriever, Document
-from langchain_community.vectorstores.pgvector import PGVector
+from langchain_community.vectorstores.pgvector import DistanceStrategy, PGVector
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import Field, PrivateAttr
 from pydantic.config import ConfigDict
+from sqlalchemy import text
+from sqlalchemy.orm import Session
 
 from src.config import Settings, get_settings
 from src.shared import bedrock
+from src.shared.cache import TTLCache
 from src.shared.prompts import PromptRepo
 
 LOGGER = logging.getLogger(__name__)
 
+# Shared by every retriever instance for the blocking Bedrock/Aurora calls that
+# can overlap within a single retrieval (query expansion, similarity searches).
+_EXECUTOR = ThreadPoolExecutor(max_workers=32, thread_name_prefix="retriever")
+
+_FUSION_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        ("system", "Ban la tro ly tao cac truy van tim kiem tuong tu."),
+        ("human", PromptRepo.get_rag_fusion_prompt()),
+    ]
+)
+_HYDE_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        ("system", "Ban viet cac doan van mo phong cau tra loi."),
+        ("human", PromptRepo.get_hyde_prompt()),
+    ]
+)
+
+# Queries shorter than this skip fusion/HyDE; statements without a trailing "?"
+# need the larger threshold.
+_MIN_EXPANSION_TOKENS = 5
+_MIN_EXPANSION_TOKENS_STATEMENT = 8
+
+# Rank damping constant from the original Reciprocal Rank Fusion paper.
+RRF_K = 60
+
+_DISTANCE_OPERATORS = {
+    DistanceStrategy.EUCLIDEAN: "<->",
+    DistanceStrategy.COSINE: "<=>",
+    DistanceStrategy.MAX_INNER_PRODUCT: "<#>",
+}
+
+
+@dataclass(frozen=True)
+class RetrievalResult:
+    """Documents for one query plus the expansions used to find them."""
+
+    documents: List[Document]
+    query_variants: List[str]
+    hypothetical_document: Optional[str]
+
 
 class AuroraPGVectorRetriever(BaseRetriever):
     """Retriever with optional query fusion, HyDE and reranking."""
@@ -36,6 +84,10 @@ class AuroraPGVectorRetriever(BaseRetriever):
     _query_llm: object = PrivateAttr()
     _fusion_prompt: ChatPromptTemplate = PrivateAttr()
     _hyde_prompt: ChatPromptTemplate = PrivateAttr()
+    _variant_cache: TTLCache[List[str]] = PrivateAttr()
+    _hyde_cache: TTLCache[str] = PrivateAttr()
+    _embedding_cache: TTLCache[array] = PrivateAttr()
+    _collection_id: Optional[str] = PrivateAttr(default=None)
 
     def __init__(self, vector_store: PGVector, settings: Settings | None = None) -> None:  # type: ignore[override]
         st = settings or get_settings()
@@ -50,29 +102,35 @@ class AuroraPGVectorRetriever(BaseRetriever):
             rerank_model_id=st.bedrock_rerank_model_id,
         )
         self._query_llm = bedrock.get_chat_model(st.bedrock_chat_model_id)
-        self._fusion_prompt = ChatPromptTemplate.from_messages(
-            [
-                ("system", "Ban la tro ly tao cac truy van tim kiem tuong tu."),
-                ("human", PromptRepo.get_rag_fusion_prompt()),
-            ]
-        )
-        self._hyde_prompt = ChatPromptTemplate.from_messages(
-            [
-                ("system", "Ban viet cac doan van mo phong cau tra loi."),
-                ("human", PromptRepo.get_hyde_prompt()),
-            ]
-        )
+        self._variant_cache = TTLCache(st.llm_cache_size, st.llm_cache_ttl_seconds)
+        self._hyde_cache = TTLCache(st.llm_cache_size, st.llm_cache_ttl_seconds)
+        # Bound to this retriever's store, so cached vectors always come from its embedder.
+        self._embedding_cache = TTLCache(st.embedding_cache_size, st.llm_cache_ttl_seconds)
+        self._fusion_prompt = _FUSION_PROMPT
+        self._hyde_prompt = _HYDE_PROMPT
+
+    @staticmethod
+    def _doc_key(doc: Document) -> Hashable:
+        source = doc.metadata.get("source", "")
+        chunk_id = doc.metadata.get("chunk_id")
+        if not source and chunk_id is None:
+            return doc.page_content[:100]
+        return (source, chunk_id)
+
+    def _reciprocal_rank_fusion(
+        self, result_lists: Sequence[Sequence[Document]]
+    ) -> List[Document]:
+        """Merge per-query rankings with RRF: score(d) = sum(1 / (RRF_K + rank))."""
 
-    def _deduplicate(self, docs: Sequence[Document]) -> List[Document]:
-        seen: Dict[str, Document] = {}
-        ordered: List[Document] = []
-        for doc in docs:
-            key = doc.metadata.get("source", "") + str(doc.metadata.get("chunk_id", ""))
-            key = key or doc.page_content[:100]
-            if key not in seen:
-                seen[key] = doc
-                ordered.append(doc)
-        return ordered
+        scores: Dict[Hashable, float] = defaultdict(float)
+        docs_by_key: Dict[Hashable, Document] = {}
+        for docs in result_lists:
+            for rank, doc in enumerate(docs, start=1):
+                key = self._doc_key(doc)
+                scores[key] += 1.0 / (RRF_K + rank)
+                docs_by_key.setdefault(key, doc)
+        ranked = sorted(scores, key=scores.__getitem__, reverse=True)
+        return [docs_by_key[key] for key in ranked[: self.primary_k * 2]]
 
     def _to_plain_text(self, response: object) -> str:
         content = getattr(response, "content", "")
@@ -85,13 +143,7 @@ class AuroraPGVectorRetriever(BaseRetriever):
             content = "\n".join(text_segments)
         return str(content)
 
-    def _generate_variant_queries(self, query: str) -> List[str]:
-        if not self.enable_query_fusion:
-            self.last_query_variants = []
-            return []
-
-        messages = self._fusion_prompt.format_messages(question=query)
-        response = self._query_llm.invoke(messages)
+    def _store_variants(self, query: str, response: object) -> List[str]:
         content = self._to_plain_text(response)
         variants: List[str] = []
         for line in content.splitlines():
@@ -103,34 +155,169 @@ class AuroraPGVectorRetriever(BaseRetriever):
             variants.append(stripped)
             if len(variants) >= self.fusion_variant_count:
                 break
-        self.last_query_variants = variants
+        self._variant_cache.set(query, variants)
         LOGGER.debug("Generated %d query variants", len(variants))
         return variants
 
-    def _generate_hypothetical_document(self, query: str) -> str:
-        if not self.enable_hyde:
-            self.last_hypothetical_document = None
-            return ""
-        messages = self._hyde_prompt.format_messages(question=query)
-        response = self._query_llm.invoke(messages)
+    def _cached_variants(self, query: str) -> Optional[List[str]]:
+        variants = self._variant_cache.get(query)
+        if variants is None:
+            return None
+        LOGGER.debug("Query variants cache hit")
+        return list(variants)
+
+    def _store_hypothetical_document(self, query: str, response: object) -> str:
         hypo = self._to_plain_text(response).strip()
-        self.last_hypothetical_document = hypo
+        self._hyde_cache.set(query, hypo)
         LOGGER.debug("Generated HyDE document length=%d", len(hypo))
         return hypo
 
-    def _retrieve_candidates(self, query: str) -> List[Document]:
-        candidates = self.vector_store.similarity_search(query, k=self.primary_k)
-        LOGGER.debug("Base query returned %d candidates", len(candidates))
-        for variant in self._generate_variant_queries(query):
-            variant_docs = self.vector_store.similarity_search(variant, k=self.primary_k)
-            LOGGER.debug("Variant '%s' returned %d candidates", variant, len(variant_docs))
-            candidates.extend(variant_docs)
-        hypothetical = self._generate_hypothetical_document(query)
+    def _cached_hypothetical_document(self, query: str) -> Optional[str]:
+        hypo = self._hyde_cache.get(query)
+        if hypo is None:
+            return None
+        LOGGER.debug("HyDE document cache hit")
+        return hypo
+
+    def _generate_variant_queries(self, query: str, expand: bool = True) -> List[str]:
+        if not (expand and self.enable_query_fusion):
+            return []
+        cached = self._cached_variants(query)
+        if cached is not None:
+            return cached
+        messages = self._fusion_prompt.format_messages(question=query)
+        response = self._query_llm.invoke(messages)
+        return self._store_variants(query, response)
+
+    async def _agenerate_variant_queries(self, query: str, expand: bool = True) -> List[str]:
+        if not (expand and self.enable_query_fusion):
+            return []
+        cached = self._cached_variants(query)
+        if cached is not None:
+            return cached
+        messages = self._fusion_prompt.format_messages(question=query)
+        response = await self._query_llm.ainvoke(messages)
+        return self._store_variants(query, response)
+
+    def _generate_hypothetical_document(self, query: str, expand: bool = True) -> Optional[str]:
+        if not (expand and self.enable_hyde):
+            return None
+        cached = self._cached_hypothetical_document(query)
+        if cached is not None:
+            return cached
+        messages = self._hyde_prompt.format_messages(question=query)
+        response = self._query_llm.invoke(messages)
+        return self._store_hypothetical_document(query, response)
+
+    async def _agenerate_hypothetical_document(
+        self, query: str, expand: bool = True
+    ) -> Optional[str]:
+        if not (expand and self.enable_hyde):
+            return None
+        cached = self._cached_hypothetical_document(query)
+        if cached is not None:
+            return cached
+        messages = self._hyde_prompt.format_messages(question=query)
+        response = await self._query_llm.ainvoke(messages)
+        return self._store_hypothetical_document(query, response)
+
+    def _embed_queries(self, query: str, extra_queries: Sequence[str]) -> List[List[float]]:
+        """Embed the base query and its expansions, base query first.
+
+        Only the base query is cached: fusion variants and HyDE passages rarely
+        repeat. Vectors are stored as float32 arrays to keep the cache compact.
+        """
+        embed = self.vector_store.embeddings.embed_query
+        cached = self._embedding_cache.get(query)
+        texts = list(extra_queries) if cached is not None else [query, *extra_queries]
+        # Titan only embeds one text per request (embed_documents loops internally),
+        # and embed_documents would use the document input type for Cohere, so
+        # issue the embed_query calls concurrently instead.
+        vectors = list(_EXECUTOR.map(embed, texts))
+        if cached is not None:
+            return [cached.tolist(), *vectors]
+        self._embedding_cache.set(query, array("f", vectors[0]))
+        return vectors
+
+    def _lookup_collection_id(self, session: Session) -> Optional[str]:
+        collection = self.vector_store.get_collection(session)
+        if collection is None:
+            LOGGER.warning("Collection %s not found", self.vector_store.collection_name)
+            self._collection_id = None
+            return None
+        self._collection_id = str(collection.uuid)
+        return self._collection_id
+
+    def _batched_similarity_search(
+        self, vectors: Sequence[List[float]]
+    ) -> List[List[Document]]:
+        """Run a top-k search for every vector in a single SQL round-trip.
+
+        Results are returned per input vector, ordered by distance.
+        """
+
+        store = self.vector_store
+        operator = _DISTANCE_OPERATORS[store._distance_strategy]
+        params: Dict[str, object] = {"k": self.primary_k}
+        rows_sql: List[str] = []
+        for idx, vector in enumerate(vectors):
+            params[f"idx_{idx}"] = idx
+            params[f"vec_{idx}"] = "[" + ",".join(map(str, vector)) + "]"
+            rows_sql.append(f"(:idx_{idx}, CAST(:vec_{idx} AS vector))")
+        statement = text(
+            f"""
+            SELECT q.idx, e.document, e.cmetadata
+            FROM (VALUES {", ".join(rows_sql)}) AS q(idx, vec)
+            CROSS JOIN LATERAL (
+                SELECT document, cmetadata, embedding {operator} q.vec AS distance
+                FROM {store.EmbeddingStore.__tablename__}
+                WHERE collection_id = CAST(:collection_id AS uuid)
+                ORDER BY embedding {operator} q.vec
+                LIMIT :k
+            ) AS e
+            ORDER BY q.idx, e.distance
+            """
+        )
+
+        results: List[List[Document]] = [[] for _ in vectors]
+        with Session(store._bind) as session:
+            cached_id = self._collection_id
+            collection_id = cached_id or self._lookup_collection_id(session)
+            if collection_id is None:
+                return results
+            rows = session.execute(statement, {**params, "collection_id": collection_id}).all()
+            if not rows and cached_id is not None:
+                # Re-ingesting with a reset recreates the collection under a new id.
+                collection_id = self._lookup_collection_id(session)
+                if collection_id is not None and collection_id != cached_id:
+                    rows = session.execute(
+                        statement, {**params, "collection_id": collection_id}
+                    ).all()
+        for idx, document, metadata in rows:
+            results[idx].append(Document(page_content=document, metadata=metadata or {}))
+        return results
+
+    def _search_candidates(
+        self, query: str, variants: Sequence[str], hypothetical: Optional[str]
+    ) -> List[Document]:
+        extra_queries = list(variants)
         if hypothetical:
-            hyde_docs = self.vector_store.similarity_search(hypothetical, k=self.primary_k)
-            LOGGER.debug("HyDE generated %d candidates", len(hyde_docs))
-            candidates.extend(hyde_docs)
-        return self._deduplicate(candidates)
+            extra_queries.append(hypothetical)
+        queries = [query, *extra_queries]
+
+        vectors = self._embed_queries(query, extra_queries)
+        results = self._batched_similarity_search(vectors)
+        for search_query, docs in zip(queries, results):
+            LOGGER.debug("Query '%s' returned %d candidates", search_query[:80], len(docs))
+        return self._reciprocal_rank_fusion(results)
+
+    @staticmethod
+    def _should_expand(query: str) -> bool:
+        """Short or keyword-style queries gain little from fusion/HyDE; skip them."""
+        tokens = len(query.split())
+        if tokens < _MIN_EXPANSION_TOKENS:
+            return False
+        return query.rstrip().endswith("?") or tokens >= _MIN_EXPANSION_TOKENS_STATEMENT
 
     def _apply_rerank(self, query: str, docs: Sequence[Document]) -> List[Document]:
         if not self.rerank_model_id:
@@ -144,18 +331,59 @@ class AuroraPGVectorRetriever(BaseRetriever):
             LOGGER.warning("Rerank failed: %s", exc)
             return list(docs[: self.final_k])
 
-    def _get_relevant_documents(self, query: str) -> List[Document]:  # type: ignore[override]
+    def retrieve(self, query: str) -> RetrievalResult:
+        """Retrieve documents and return them with the expansions used for this call.
+
+        The retriever is shared across requests, so callers that need the fusion
+        variants or HyDE text must take them from the result, not from instance state.
+        """
+        LOGGER.debug("Retrieving documents for query: %s", query)
+        expand = self._should_expand(query)
+        # Fusion and HyDE prompts are independent LLM calls; overlap their latency.
+        variants_future = _EXECUTOR.submit(self._generate_variant_queries, query, expand)
+        hyde_future = _EXECUTOR.submit(self._generate_hypothetical_document, query, expand)
+        variants = variants_future.result()
+        hypothetical = hyde_future.result()
+        candidates = self._search_candidates(query, variants, hypothetical)
+        LOGGER.debug("Total unique candidates: %d", len(candidates))
+        documents = self._apply_rerank(query, candidates)
+        return RetrievalResult(documents, variants, hypothetical)
+
+    async def aretrieve(self, query: str) -> RetrievalResult:
+        """Async variant of :meth:`retrieve`."""
         LOGGER.debug("Retrieving documents for query: %s", query)
-        candidates = self._retrieve_candidates(query)
+        expand = self._should_expand(query)
+        variants, hypothetical = await asyncio.gather(
+            self._agenerate_variant_queries(query, expand),
+            self._agenerate_hypothetical_document(query, expand),
+        )
+        # PGVector and the embedding client are synchronous; keep them off the event loop.
+        candidates = await asyncio.to_thread(
+            self._search_candidates, query, variants, hypothetical
+        )
         LOGGER.debug("Total unique candidates: %d", len(candidates))
-        return self._apply_rerank(query, candidates)
+        documents = await asyncio.to_thread(self._apply_rerank, query, candidates)
+        return RetrievalResult(documents, variants, hypothetical)
+
+    def _remember(self, result: RetrievalResult) -> List[Document]:
+        # Kept for LangChain callers; only reliable when the retriever is not shared.
+        self.last_query_variants = list(result.query_variants)
+        self.last_hypothetical_document = result.hypothetical_document
+        return result.documents
+
+    def _get_relevant_documents(self, query: str) -> List[Document]:  # type: ignore[override]
+        return self._remember(self.retrieve(query))
 
     async def _aget_relevant_documents(self, query: str) -> List[Document]:  # type: ignore[override]
-        return self._get_relevant_documents(query)
+        return self._remember(await self.aretrieve(query))
 
 
 def build_vector_store(settings: Settings | None = None) -> PGVector:
-    """Factory for PGVector backed by Aurora."""
+    """Factory for PGVector backed by Aurora.
+
+    The store owns a pooled SQLAlchemy engine, so build it once and share it
+    across requests rather than per query.
+    """
 
     st = settings or get_settings()
     embedding_model = bedrock.get_embedding_model(st.bedrock_embedding_model_id)
@@ -163,6 +391,7 @@ def build_vector_store(settings: Settings | None = None) -> PGVector:
         connection_string=st.pg_connection_uri,
         collection_name=st.vector_collection,
         embedding_function=embedding_model,
+        engine_args=st.pg_engine_args,
     )
 
 
@@ -1,12 +1,14 @@
 """Utilities for interacting with Amazon Bedrock."""
 from __future__ import annotations
 
-import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 from typing import Any, Dict, Iterable, List, Sequence
 
 import boto3
+import orjson
+from botocore.config import Config
 from langchain.schema import Document
 from langchain_aws.chat_models import ChatBedrock
 from langchain_aws.embeddings import BedrockEmbeddings
@@ -17,7 +19,17 @@ def _bedrock_client() -> Any:
     region = os.environ.get("BEDROCK_REGION") or os.environ.get("AWS_REGION")
     if not region:
         raise EnvironmentError("BEDROCK_REGION or AWS_REGION must be defined")
-    return boto3.client("bedrock-runtime", region_name=region)
+    # The retriever and ingestion fan out concurrent calls on this one client, so
+    # lift botocore's default pool of 10 connections and retry adaptively on throttling.
+    config = Config(
+        region_name=region,
+        max_pool_connections=64,
+        retries={"mode": "adaptive", "max_attempts": 3},
+        tcp_keepalive=True,
+        connect_timeout=3,
+        read_timeout=60,
+    )
+    return boto3.client("bedrock-runtime", config=config)
 
 
 @lru_cache(maxsize=4)
@@ -36,7 +48,7 @@ def invoke_text_generation(model_id: str, system_prompt: str, user_prompt: str)
     """Low-level invocation helper when LangChain wrappers are not desired."""
     response = _bedrock_client().invoke_model(
         modelId=model_id,
-        body=json.dumps(
+        body=orjson.dumps(
             {
                 "messages": [
                     {"role": "system", "content": [{"text": system_prompt}]},
@@ -45,7 +57,7 @@ def invoke_text_generation(model_id: str, system_prompt: str, user_prompt: str)
             }
         ),
     )
-    payload = json.loads(response["body"].read())
+    payload = orjson.loads(response["body"].read())
     outputs = payload.get("output", {}).get("message", {}).get("content", [])
     texts = [item.get("text", "") for item in outputs]
     return "\n".join(texts).strip()
@@ -69,14 +81,15 @@ def invoke_rerank(
         "query": query,
         "documents": [doc.page_content for doc in documents],
         "topN": min(top_n, len(documents)),
-        "returnDocuments": True,
+        # Documents are rebuilt from the input by index, so skip echoing them back.
+        "returnDocuments": False,
     }
 
     response = _bedrock_client().invoke_model(
         modelId=model_id,
-        body=json.dumps(payload),
+        body=orjson.dumps(payload),
     )
-    body = json.loads(response["body"].read())
+    body = orjson.loads(response["body"].read())
     results = body.get("results", [])
 
     ranked_docs: List[Document] = []
@@ -104,11 +117,18 @@ def chunked(iterable: Iterable[Any], size: int) -> Iterable[List[Any]]:
 
 
 def embed_texts(
-    embedding_model: BedrockEmbeddings, texts: List[str], batch_size: int = 16
+    embedding_model: BedrockEmbeddings,
+    texts: List[str],
+    batch_size: int = 96,
+    max_workers: int = 8,
 ) -> List[List[float]]:
-    """Batch embedding helper to reduce Bedrock calls."""
-    results: List[List[float]] = []
-    for batch in chunked(texts, batch_size):
-        results.extend(embedding_model.embed_documents(batch))
-    return results
+    """Batch embedding helper that keeps several Bedrock requests in flight.
 
+    Batches are embedded concurrently; results keep the order of texts.
+    """
+    batches = list(chunked(texts, batch_size))
+    if len(batches) <= 1:
+        return [vector for batch in batches for vector in embedding_model.embed_documents(batch)]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as executor:
+        embedded = executor.map(embedding_model.embed_documents, batches)
+        return [vector for batch_vectors in embedded for vector in batch_vectors]
@@ -0,0 +1,147 @@
+"""Caching helpers shared across the RAG service."""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, Tuple, TypeVar
+
+import orjson
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+from src.config import Settings
+
+LOGGER = logging.getLogger(__name__)
+
+# Bump when prompts or the response shape change so old cached answers stop matching.
+RESPONSE_CACHE_VERSION = 1
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """Thread-safe, size-bounded LRU cache whose entries expire after ``ttl`` seconds.
+
+    A ``maxsize`` of zero disables caching entirely.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600.0) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[V]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: V) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class ResponseCache:
+    """Redis cache-aside store for serialised ``/query`` responses.
+
+    Without a Redis URL every lookup misses and writes are dropped, so callers do
+    not need to special-case a disabled cache. Redis errors and timeouts are
+    logged and treated as misses; short socket timeouts keep an unreachable or
+    stalled Redis from holding requests until the OS TCP timeout.
+    """
+
+    def __init__(
+        self,
+        redis_url: Optional[str],
+        ttl_seconds: int,
+        namespace: str,
+        timeout_seconds: float = 0.2,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.namespace = namespace
+        self._client = (
+            aioredis.from_url(
+                redis_url,
+                socket_connect_timeout=timeout_seconds,
+                socket_timeout=timeout_seconds,
+            )
+            if redis_url
+            else None
+        )
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "ResponseCache":
+        return cls(
+            settings.redis_url,
+            settings.response_cache_ttl_seconds,
+            namespace=cls.settings_namespace(settings),
+        )
+
+    @staticmethod
+    def settings_namespace(settings: Settings) -> str:
+        """Fingerprint every setting that shapes an answer.
+
+        Keeps a config change, or another deployment sharing the same Redis, from
+        serving answers produced under different models, collections or retrieval.
+        """
+        fingerprint = orjson.dumps(
+            [
+                RESPONSE_CACHE_VERSION,
+                settings.vector_collection,
+                settings.bedrock_chat_model_id,
+                settings.bedrock_embedding_model_id,
+                settings.bedrock_rerank_model_id,
+                settings.vector_search_k,
+                settings.vector_search_k_rerank,
+                settings.enable_query_fusion,
+                settings.fusion_variant_count,
+                settings.enable_hyde,
+                settings.answer_language,
+            ]
+        )
+        return hashlib.sha1(fingerprint).hexdigest()[:16]
+
+    def key_for(self, question: str) -> str:
+        digest = hashlib.sha1(question.encode("utf-8")).hexdigest()
+        return f"rag:query:{self.namespace}:{digest}"
+
+    async def get(self, key: str) -> Optional[bytes]:
+        if self._client is None:
+            return None
+        try:
+            return await self._client.get(key)
+        except (RedisError, asyncio.TimeoutError) as exc:
+            LOGGER.warning("Response cache lookup failed: %s", exc)
+            return None
+
+    async def set(self, key: str, body: bytes) -> None:
+        if self._client is None:
+            return
+        try:
+            await self._client.setex(key, self.ttl_seconds, body)
+        except (RedisError, asyncio.TimeoutError) as exc:
+            LOGGER.warning("Response cache store failed: %s", exc)
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()